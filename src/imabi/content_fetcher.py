@@ -1,80 +1,153 @@
 # ♥♥─── Imabi Content Fetcher ───────────────────────────
 from __future__ import annotations
 
+import re
+from types import MappingProxyType
+from pathlib import Path
+from collections.abc import Mapping
+
 from bs4 import Tag, BeautifulSoup
+from lxml import html as lxml_html
 import requests
+from lxml.html import HtmlElement
+import requests_cache
+from requests.adapters import Retry, HTTPAdapter
+
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/129.0.0.0 Safari/537.36"
+)
+
+CACHE_EXPIRY_SECONDS = 604800  # one week
+
+# Known-dead imabi.net links and their imabi.org equivalents; read-only so
+# every HTMLCleaner shares the one mapping.
+_URL_REPLACEMENTS = MappingProxyType({
+    "https://www.imabi.net/timei.htm": "https://imabi.org/counters-iii-time-part-i-%e6%97%a5-%e9%80%b1%e9%96%93-%e6%9c%88-%e5%b9%b4-etc/",
+    "https://www.imabi.net/theseasons.htm": "https://imabi.org/the-seasons%e3%80%80%e6%98%a5%e5%a4%8f%e7%a7%8b%e5%86%ac/",
+    "https://www.imabi.net/the-affix-gu": "https://imabi.org/the-verbal-affix-%ef%bd%9e%e3%81%90-%ef%bd%9e%e3%82%89%e3%81%90%e3%83%bb%e3%82%84%e3%81%90/",
+    "https://www.imabi.net/nivskara.htm": "https://imabi.org/the-particle-%e3%81%8b%e3%82%89/",
+    "https://www.imabi.net/l55theparticlenagara.htm": "https://imabi.org/the-particles-%e3%81%a4%e3%81%a4-%e3%81%aa%e3%81%8c%e3%82%89/",
+    "https://www.imabi.net/l279yotsugana.htm": "https://imabi.org/yotsugana/",
+    "https://www.imabi.net/l216nounspronouns.htm#825855643": "https://imabi.org/reflexive-pronouns/",
+    "https://www.imabi.net/l171kimigayoiroha.htm": "https://imabi.org/the-%e5%90%9b%e3%81%8c%e4%bb%a3-%e3%81%84%e3%82%8d%e3%81%af/",
+    "https://www.imabi.net/l12regularverbs.htm": "https://imabi.org/class-regular-verbs-i/",
+    "https://www.imabi.net/l116numbersviicountersii.htm": "https://imabi.org/counters-vi/",
+    "https://www.imabi.net/holidays": "https://imabi.org/holidays%e3%80%80%e6%97%a5%e6%9c%ac%e3%81%ae%e7%a5%9d%e6%97%a5/",
+    "https://www.imabi.net/hatsuon.htm": "https://imabi.org/hatsuon/",
+    "https://www.imabi.net/funeral.htm": "https://imabi.org/japanese-ceremony-customs-%e5%86%a0%e5%a9%9a%e8%91%ac%e7%a5%ad/",
+    "https://www.imabi.net/dailyexpressionsii.htm": "https://imabi.org/the-particle-ka-%e3%81%8b-i-basic-questions/",
+    "https://www.imabi.net/classicaladjectivesii.htm": "https://imabi.org/classical-adjectives-ii/",
+    "https://www.imabi.net/barecoveredforms.htm": "https://imabi.org/bare-covered-forms/",
+    "https://www.imabi.net/adjectivesii.htm": "https://imabi.org/adjectival-nouns-i%e3%80%80%e5%bd%a2%e5%ae%b9%e5%8b%95%e8%a9%9e%e2%91%a0/",
+    "https://imabi.org/wp-admin/post.php?post=221&amp;action=edit#cc836554-5736-4e48-aef9-2765fc98fcd9-link": "",
+})
+
+# The dead links appear verbatim in the page source, so one C-level regex
+# substitution over the decoded page replaces them all before parsing.
+_URL_RE = re.compile("|".join(map(re.escape, _URL_REPLACEMENTS)))
 
 
 class ContentFetcher:
     """Handles fetching content from URLs."""
 
     def __init__(self, session: requests.Session | None = None) -> None:
-        """Initialize the fetcher with a requests session."""
-        self.session = session or requests.Session()
+        """Initialize the fetcher with a disk-cached session with keep-alive pooling."""
+        self.session = session or requests_cache.CachedSession(
+            cache_name=str(Path.home() / ".cache" / "imabi"),
+            backend="sqlite",
+            expire_after=CACHE_EXPIRY_SECONDS,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Assign outright: a fresh session already carries the default
+        # python-requests UA, so setdefault would never replace it
+        self.session.headers["User-Agent"] = USER_AGENT
 
-    def fetch_content(self, url: str) -> tuple[bytes, str]:
-        """Fetch content and return it with its base URI."""
+    def fetch_content(self, url: str) -> tuple[str, str]:
+        """Fetch content, decoded with the response charset, and its base URI."""
         response = self.session.get(url)
         response.raise_for_status()
-        return response.content, url
+        # Without a charset in the headers requests falls back to latin-1,
+        # which mojibakes the Japanese text; sniff the body instead
+        if "charset" not in response.headers.get("Content-Type", "").lower():
+            response.encoding = response.apparent_encoding
+        return response.text, url
+
+    def close(self) -> None:
+        """Release the session's pooled connections."""
+        self.session.close()
 
 
 class HTMLCleaner:
-    """Cleans and preprocesses HTML content."""
+    """Cleans and preprocesses HTML content on the lxml C tree."""
 
     UNWANTED_SELECTORS = ["div.sharedaddy", "nav.entry-breadcrumbs", "div.wp-block-buttons"]
-    URL_REPLACEMENTS: dict[str, str] = {
-        "https://www.imabi.net/timei.htm": "https://imabi.org/counters-iii-time-part-i-%e6%97%a5-%e9%80%b1%e9%96%93-%e6%9c%88-%e5%b9%b4-etc/",
-        "https://www.imabi.net/theseasons.htm": "https://imabi.org/the-seasons%e3%80%80%e6%98%a5%e5%a4%8f%e7%a7%8b%e5%86%ac/",
-        "https://www.imabi.net/the-affix-gu": "https://imabi.org/the-verbal-affix-%ef%bd%9e%e3%81%90-%ef%bd%9e%e3%82%89%e3%81%90%e3%83%bb%e3%82%84%e3%81%90/",
-        "https://www.imabi.net/nivskara.htm": "https://imabi.org/the-particle-%e3%81%8b%e3%82%89/",
-        "https://www.imabi.net/l55theparticlenagara.htm": "https://imabi.org/the-particles-%e3%81%a4%e3%81%a4-%e3%81%aa%e3%81%8c%e3%82%89/",
-        "https://www.imabi.net/l279yotsugana.htm": "https://imabi.org/yotsugana/",
-        "https://www.imabi.net/l216nounspronouns.htm#825855643": "https://imabi.org/reflexive-pronouns/",
-        "https://www.imabi.net/l171kimigayoiroha.htm": "https://imabi.org/the-%e5%90%9b%e3%81%8c%e4%bb%a3-%e3%81%84%e3%82%8d%e3%81%af/",
-        "https://www.imabi.net/l12regularverbs.htm": "https://imabi.org/class-regular-verbs-i/",
-        "https://www.imabi.net/l116numbersviicountersii.htm": "https://imabi.org/counters-vi/",
-        "https://www.imabi.net/holidays": "https://imabi.org/holidays%e3%80%80%e6%97%a5%e6%9c%ac%e3%81%ae%e7%a5%9d%e6%97%a5/",
-        "https://www.imabi.net/hatsuon.htm": "https://imabi.org/hatsuon/",
-        "https://www.imabi.net/funeral.htm": "https://imabi.org/japanese-ceremony-customs-%e5%86%a0%e5%a9%9a%e8%91%ac%e7%a5%ad/",
-        "https://www.imabi.net/dailyexpressionsii.htm": "https://imabi.org/the-particle-ka-%e3%81%8b-i-basic-questions/",
-        "https://www.imabi.net/classicaladjectivesii.htm": "https://imabi.org/classical-adjectives-ii/",
-        "https://www.imabi.net/barecoveredforms.htm": "https://imabi.org/bare-covered-forms/",
-        "https://www.imabi.net/adjectivesii.htm": "https://imabi.org/adjectival-nouns-i%e3%80%80%e5%bd%a2%e5%ae%b9%e5%8b%95%e8%a9%9e%e2%91%a0/",
-        "https://imabi.org/wp-admin/post.php?post=221&amp;action=edit#cc836554-5736-4e48-aef9-2765fc98fcd9-link": "",
-    }
-
-    def clean_structure(self, content_div: Tag) -> Tag:
+    # Comma-joined so the selector engine walks the tree once for all of them
+    UNWANTED_SELECTOR = ", ".join(UNWANTED_SELECTORS)
+    URL_REPLACEMENTS: Mapping[str, str] = _URL_REPLACEMENTS
+
+    def extract(self, html_content: str, selector: str) -> HtmlElement | None:
+        """Parse a full page with lxml and select the target element."""
+        html_content = _URL_RE.sub(lambda m: _URL_REPLACEMENTS[m.group(0)], html_content)
+        tree = lxml_html.fromstring(html_content)
+        matches = tree.cssselect(selector)
+        return matches[0] if matches else None
+
+    def clean_tree(self, content_el: HtmlElement) -> HtmlElement:
         """Remove unwanted elements and clean HTML structure."""
-        self._remove_unwanted_elements(content_div)
-        self._fix_br_tags_in_links(content_div)
-        self._remove_empty_links(content_div)
-        return content_div
+        self._remove_unwanted_elements(content_el)
+        # Snapshot the anchors once; helpers work from the list so the tree
+        # is never re-walked for them
+        anchors = [a_el for a_el in content_el.iter("a") if a_el.getparent() is not None]
+        self._clean_links(anchors)
+        return content_el
+
+    def to_soup(self, content_el: HtmlElement) -> Tag:
+        """Wrap a cleaned lxml element in BeautifulSoup for the formatters."""
+        soup = BeautifulSoup(lxml_html.tostring(content_el, encoding="unicode"), "lxml")
+        return soup.find(content_el.tag)
 
-    def _remove_unwanted_elements(self, content_div: Tag) -> None:
+    def _remove_unwanted_elements(self, content_el: HtmlElement) -> None:
         """Remove unwanted HTML elements based on CSS selectors."""
-        for selector in self.UNWANTED_SELECTORS:
-            for element in content_div.select(selector):
-                element.decompose()
-
-    def _fix_br_tags_in_links(self, content_div: Tag) -> None:
-        """Move <br> tags outside of their parent <a> tags."""
-        for a_tag in content_div.find_all("a"):
-            for br_tag in a_tag.find_all("br"):
-                new_br = BeautifulSoup("", "html.parser").new_tag("br")
-                a_tag.insert_after(new_br)
-                br_tag.decompose()
-
-    def _remove_empty_links(self, content_div: Tag) -> None:
-        """Remove empty or whitespace-only <a> tags."""
-        for a_tag in content_div.find_all("a"):
-            if not a_tag.get_text(strip=True):
-                a_tag.decompose()
-
-    def _replace_links(self, content_div: Tag) -> None:
-        for a_tag in content_div.find_all("a"):
-            href = a_tag.get("href")
-            if href is None:
+        for element in content_el.cssselect(self.UNWANTED_SELECTOR):
+            self._drop_element(element)
+
+    def _clean_links(self, anchors: list[HtmlElement]) -> None:
+        """Rewrite, unwrap, and prune <a> tags in a single pass over the list."""
+        for a_el in anchors:
+            if a_el.getparent() is None:
                 continue
-            if href in self.URL_REPLACEMENTS:
-                a_tag["href"] = self.URL_REPLACEMENTS[href]
+            # Move <br> tags outside of their parent <a> tag (directly after
+            # the anchor, before its tail text)
+            parent = a_el.getparent()
+            for br_el in list(a_el.iter("br")):
+                new_br = lxml_html.Element("br")
+                new_br.tail = a_el.tail
+                a_el.tail = None
+                parent.insert(parent.index(a_el) + 1, new_br)
+                self._drop_element(br_el)
+
+            # Drop empty or whitespace-only links
+            if not a_el.text_content().strip():
+                self._drop_element(a_el)
+
+    @staticmethod
+    def _drop_element(element: HtmlElement) -> None:
+        """Remove an element from the tree, keeping its tail text in place."""
+        parent = element.getparent()
+        if parent is None:
+            return
+        if element.tail:
+            previous = element.getprevious()
+            if previous is not None:
+                previous.tail = (previous.tail or "") + element.tail
+            else:
+                parent.text = (parent.text or "") + element.tail
+        parent.remove(element)
@@ -49,6 +49,8 @@ class ProcessingConfig:
     images_dir_name: str = "Images"
     css_file: Path | None = None
     generate_epub: bool = True
+    convert_webp: bool = True
+    image_max_dim: int = 1280
     save_raw: bool = False
     test_mode: bool = False
     test_lessons: int = 5
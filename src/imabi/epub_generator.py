@@ -1,15 +1,94 @@
 # ─── EPUB Generation ───────────────────────────────────────────────────────────
 from __future__ import annotations
 
+from io import StringIO
 import uuid
 from pathlib import Path
-from datetime import datetime
+import zipfile
+from datetime import datetime, timezone
 
 import typer
 from ebooklib import epub
 
 from .data_models import LessonData, ProcessingConfig
-from .image_processor import ImageProcessor
+from .image_processor import _convert_to_png_worker
+
+
+_MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".svg": "image/svg+xml",
+    ".webp": "image/webp",
+}
+
+_TITLE_PAGE_HTML = """<body class="justified">
+    <p class="tit-publisher">Seth Coonrod<br/> Taylor V. Edwards</p>
+    <p></p>
+    <p class="half-title">IMABI 今日</p>
+    <p class="half-subtitle">「いまび」<br/>Guided Japanese Mastery</p>
+    <p class="tit-publisher1">From <a href="https://imabi.org">imabi.org</a></p>
+    </body>"""
+
+_DEFAULT_CSS = """
+    body {
+        font-family: sans-serif;
+        line-height: 1.6;
+        margin: 1em;
+        text-align: justify;
+    }
+    .justified { text-align: justify; }
+    .wrap-90 { max-width: 90%; margin: 0 auto; }
+    .align-center { text-align: center; }
+    .align-right { text-align: right; }
+    .margin-right-xl { margin-right: 2em; }
+    .margin-top-xxl { margin-top: 3em; }
+    .fs-xxl { font-size: 1.5em; }
+    .half-title { font-size: 2em; font-weight: bold; text-align: center; margin: 1em 0; }
+    .half-subtitle { font-size: 1.2em; text-align: center; margin: 1em 0; }
+    .tit-publisher, .tit-publisher1 { text-align: center; margin: 1em 0; }
+    .section-title {
+        text-align: center;
+        color: #2c3e50;
+        border-bottom: 3px solid #3498db;
+        padding-bottom: 0.5em;
+    }
+    h1, h2, h3, h4, h5, h6 {
+        margin-top: 1.5em;
+        margin-bottom: 0.5em;
+        text-align: left;
+    }
+    .chapter {
+        font-size: 0.9em;
+        color: #7f8c8d;
+        font-style: italic;
+        margin-bottom: 0.5em;
+    }
+    .numerada { margin-left: 1.5em; }
+    .no-list-type { list-style-type: none; }
+    .toc li { margin-bottom: 0.5em; }
+    header {
+        border-bottom: 2px solid #3498db;
+        padding-bottom: 1em;
+        margin-bottom: 2em;
+    }
+    footer, .footnote {
+        border-top: 1px solid #bdc3c7;
+        padding-top: 1em;
+        margin-top: 2em;
+        font-size: 0.9em;
+    }
+    .dedication { font-style: italic; }
+    .hr { border-top: 1px solid #bdc3c7; padding-top: 1em; margin-top: 1em; }
+    img {
+        max-width: 100%;
+        height: auto;
+        display: block;
+        margin: 1em auto;
+    }
+    ol, ul { margin-left: 1.5em; }
+    """
 
 
 class EPUBGenerator:
@@ -19,6 +98,8 @@ class EPUBGenerator:
         """Initialize the EPUB generator."""
         self.config = config
         self.book = epub.EpubBook()
+        # Captured once so every generated page carries the build start time
+        self._build_ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
         self._setup_metadata()
 
     def _setup_metadata(self) -> None:
@@ -33,7 +114,7 @@ class EPUBGenerator:
         self,
         lesson_dict: dict[str, list[LessonData]],
         processed_content: dict[str, str],
-        processed_images: list[tuple[str, bytes]],
+        processed_images: list[tuple[str, str, Path]],
     ) -> Path:
         """Create the complete EPUB file using ebooklib."""
         # Add CSS
@@ -91,10 +172,29 @@ class EPUBGenerator:
         # Write EPUB
         epub_path = self.config.output_dir / "imabi.epub"
         epub.write_epub(str(epub_path), self.book, {})
+        self._repack_images_uncompressed(epub_path)
 
         typer.echo(f"📚 EPUB created: {epub_path}")
         return epub_path
 
+    @staticmethod
+    def _repack_images_uncompressed(epub_path: Path) -> None:
+        """Re-pack image entries as ZIP_STORED.
+
+        PNG/JPEG payloads are already compressed; re-deflating them burns CPU
+        for no size win. Text entries stay deflated at a light level.
+        """
+        tmp_path = epub_path.with_suffix(".epub.tmp")
+        with zipfile.ZipFile(epub_path) as source, zipfile.ZipFile(tmp_path, "w") as repacked:
+            for info in source.infolist():
+                data = source.read(info.filename)
+                suffix = Path(info.filename).suffix.lower()
+                if info.filename == "mimetype" or suffix in _MEDIA_TYPES:
+                    repacked.writestr(info.filename, data, compress_type=zipfile.ZIP_STORED)
+                else:
+                    repacked.writestr(info.filename, data, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        tmp_path.replace(epub_path)
+
     def _add_css(self) -> None:
         """Add CSS stylesheet to the EPUB."""
         if self.config.css_file and self.config.css_file.exists():
@@ -110,15 +210,19 @@ class EPUBGenerator:
         )
         self.book.add_item(css_item)
 
-    def _add_images(self, processed_images: list[tuple[str, bytes]]) -> None:
-        """Add all processed images to the EPUB."""
-        for filename, image_data in processed_images:
-            media_type = self._get_media_type(filename)
+    def _add_images(self, processed_images: list[tuple[str, str, Path]]) -> None:
+        """Add all processed images to the EPUB, streaming each file from disk."""
+        seen: set[str] = set()
+        for stem, suffix, image_path in processed_images:
+            # URL-cached images appear once per referencing lesson
+            if stem in seen:
+                continue
+            seen.add(stem)
             img_item = epub.EpubItem(
-                uid=f"img_{Path(filename).stem}",
-                file_name=f"Images/{filename}",
-                media_type=media_type,
-                content=image_data,
+                uid=f"img_{stem}",
+                file_name=f"Images/{stem}{suffix}",
+                media_type=_MEDIA_TYPES.get(suffix, "application/octet-stream"),
+                content=image_path.read_bytes(),
             )
             self.book.add_item(img_item)
 
@@ -130,10 +234,11 @@ class EPUBGenerator:
         cover_data = self.config.cover_image_path.read_bytes()
         cover_ext = self.config.cover_image_path.suffix
 
-        # Convert cover to PNG if needed
+        # Convert cover to PNG if needed; one image doesn't warrant an
+        # ImageProcessor (worker pool, HTTP client), so call the conversion
+        # function directly
         if cover_ext.lower() in [".svg", ".webp"]:
-            processor = ImageProcessor()
-            cover_data = processor._convert_to_png(cover_data, cover_ext.lower())
+            cover_data = _convert_to_png_worker(cover_data, cover_ext.lower(), self.config.image_max_dim)
             cover_ext = ".png"
 
         self.book.set_cover(f"cover{cover_ext}", cover_data)
@@ -156,14 +261,7 @@ class EPUBGenerator:
 
     def _create_title_page(self) -> epub.EpubHtml:
         """Create title page."""
-        title_content = """<body class="justified">
-            <p class="tit-publisher">Seth Coonrod<br/> Taylor V. Edwards</p>
-            <p></p>
-            <p class="half-title">IMABI 今日</p>
-            <p class="half-subtitle">「いまび」<br/>Guided Japanese Mastery</p>
-            <p class="tit-publisher1">From <a href="https://imabi.org">imabi.org</a></p>
-            </body>"""
-        return self._create_content_item("title", "Title Page", title_content)
+        return self._create_content_item("title", "Title Page", _TITLE_PAGE_HTML)
 
     def _create_credits_page(self) -> epub.EpubHtml:
         """Create credits page."""
@@ -183,7 +281,7 @@ class EPUBGenerator:
                 <div class="hr align-right">
                 <dl>
                 <p><dt class="align-right"><strong>FOR PERSONAL USE ONLY</strong><br/></dt></p>
-                <p><dd>EPUB generated on {datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")}</dd></p>
+                <p><dd>EPUB generated on {self._build_ts}</dd></p>
                 <p>by <em>vainilie</em></p>
                 </dl>
                 </div>
@@ -192,30 +290,27 @@ class EPUBGenerator:
 
     def _create_toc_page(self, lesson_dict: dict[str, list[LessonData]]) -> epub.EpubHtml:
         """Create table of contents page."""
-        toc_parts = ['<body class="justified"><h1>Table of Contents</h1>']
+        buf = StringIO()
+        buf.write('<body class="justified"><h1>Table of Contents</h1>')
         lesson_counter = 0
 
         for section_idx, (section, lessons) in enumerate(lesson_dict.items(), 1):
-            section_id = f"section-{section_idx}"
-            toc_parts.extend((
-                f'<h2 id="{section_id}">{section}</h2>',
+            buf.write(
+                f'<h2 id="section-{section_idx}">{section}</h2>'
                 f'<ol start="{lesson_counter + 1}" class="no-list-type toc">',
-            ))
+            )
 
             for lesson in lessons:
                 lesson_counter += 1
                 if lesson.has_link:
-                    toc_parts.append(
-                        f'<li><a href="{lesson.filename}">{lesson.original_number} • {lesson.title}</a></li>',
-                    )
+                    buf.write(f'<li><a href="{lesson.filename}">{lesson.original_number} • {lesson.title}</a></li>')
                 else:
-                    toc_parts.append(f"<li>{lesson.original_number} • {lesson.title}</li>")
+                    buf.write(f"<li>{lesson.original_number} • {lesson.title}</li>")
 
-            toc_parts.append("</ol>")
+            buf.write("</ol>")
 
-        toc_parts.append("</body>")
-        toc_content = "".join(toc_parts)
-        return self._create_content_item("toc_page", "Table of Contents", toc_content)
+        buf.write("</body>")
+        return self._create_content_item("toc_page", "Table of Contents", buf.getvalue())
 
     def _create_section_page(self, section_idx: int, section_title: str) -> epub.EpubHtml:
         """Create a section divider page."""
@@ -239,75 +334,6 @@ class EPUBGenerator:
             <image width="1838" height="2725" xlink:href="../Images/{cover_filename}" role="doc-cover"/>
             </svg> </div> </body>"""
 
-    def _get_media_type(self, filename: str) -> str:
-        """Get MIME type for a file based on its extension."""
-        ext = Path(filename).suffix.lower()
-        return {
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".gif": "image/gif",
-            ".svg": "image/svg+xml",
-            ".webp": "image/webp",
-        }.get(ext, "application/octet-stream")
-
     def _get_default_css(self) -> str:
         """Return default CSS styles."""
-        return """
-            body {
-                font-family: sans-serif;
-                line-height: 1.6;
-                margin: 1em;
-                text-align: justify;
-            }
-            .justified { text-align: justify; }
-            .wrap-90 { max-width: 90%; margin: 0 auto; }
-            .align-center { text-align: center; }
-            .align-right { text-align: right; }
-            .margin-right-xl { margin-right: 2em; }
-            .margin-top-xxl { margin-top: 3em; }
-            .fs-xxl { font-size: 1.5em; }
-            .half-title { font-size: 2em; font-weight: bold; text-align: center; margin: 1em 0; }
-            .half-subtitle { font-size: 1.2em; text-align: center; margin: 1em 0; }
-            .tit-publisher, .tit-publisher1 { text-align: center; margin: 1em 0; }
-            .section-title {
-                text-align: center;
-                color: #2c3e50;
-                border-bottom: 3px solid #3498db;
-                padding-bottom: 0.5em;
-            }
-            h1, h2, h3, h4, h5, h6 {
-                margin-top: 1.5em;
-                margin-bottom: 0.5em;
-                text-align: left;
-            }
-            .chapter {
-                font-size: 0.9em;
-                color: #7f8c8d;
-                font-style: italic;
-                margin-bottom: 0.5em;
-            }
-            .numerada { margin-left: 1.5em; }
-            .no-list-type { list-style-type: none; }
-            .toc li { margin-bottom: 0.5em; }
-            header {
-                border-bottom: 2px solid #3498db;
-                padding-bottom: 1em;
-                margin-bottom: 2em;
-            }
-            footer, .footnote {
-                border-top: 1px solid #bdc3c7;
-                padding-top: 1em;
-                margin-top: 2em;
-                font-size: 0.9em;
-            }
-            .dedication { font-style: italic; }
-            .hr { border-top: 1px solid #bdc3c7; padding-top: 1em; margin-top: 1em; }
-            img {
-                max-width: 100%;
-                height: auto;
-                display: block;
-                margin: 1em auto;
-            }
-            ol, ul { margin-left: 1.5em; }
-            """
+        return _DEFAULT_CSS
@@ -2,11 +2,17 @@
 from __future__ import annotations
 
 from pathlib import Path
+from itertools import islice
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from bs4 import BeautifulSoup
+from rich.progress import Progress
+
+from lxml import html as lxml_html
 import typer
 
 from .data_models import LessonData, ContentType, ProcessingConfig
+from .epub_generator import EPUBGenerator
 from .content_fetcher import HTMLCleaner, ContentFetcher
 from .image_processor import ImageProcessor
 from .index_processor import IndexProcessor
@@ -17,40 +23,55 @@ from .lesson_processor import LessonFormatter
 class ImabiProcessor:
     """Main processor class that coordinates all operations."""
 
+    MAX_FETCH_WORKERS = 8
+
     def __init__(self, config: ProcessingConfig) -> None:
         """Initialize the main processor."""
         self.config = config
         self.fetcher = ContentFetcher()
         self.cleaner = HTMLCleaner()
-        self.image_processor = ImageProcessor()
+        self.progress = Progress(transient=True)
+        self.image_processor = ImageProcessor(
+            convert_webp=config.convert_webp,
+            image_max_dim=config.image_max_dim,
+            progress=self.progress,
+        )
         self.lesson_formatter = LessonFormatter()
         self.index_processor = IndexProcessor()
 
-        # Storage for processed content and images
+        # Storage for processed content and images (lessons are fetched in
+        # parallel, so writes are serialized through a lock)
         self.processed_content: dict[str, str] = {}
-        self.all_processed_images: list[tuple[str, bytes]] = []
+        self.all_processed_images: list[tuple[str, str, Path]] = []
+        self._results_lock = threading.Lock()
 
     def process_full_site(self) -> Path | None:
         """Process the entire Imabi site and optionally create an EPUB."""
-        # Process index
-        index_xhtml, lesson_data = self.process_content(
-            url=self.config.base_url,
-            content_type=ContentType.INDEX,
-            selector="aside",
-        )
-        self.processed_content["index"] = index_xhtml
-
-        # Process glossary
-        glossary_xhtml, _ = self.process_content(
-            url=f"{self.config.base_url}/glossary",
-            content_type=ContentType.GLOSSARY,
-            selector="article",
-            chapter_str="glossary",
-        )
-        self.processed_content["glossary"] = glossary_xhtml
+        self.progress.start()
+        try:
+            # Process index
+            index_xhtml, lesson_data = self.process_content(
+                url=self.config.base_url,
+                content_type=ContentType.INDEX,
+                selector="aside",
+            )
+            self.processed_content["index"] = index_xhtml
+
+            # Process glossary
+            glossary_xhtml, _ = self.process_content(
+                url=f"{self.config.base_url}/glossary",
+                content_type=ContentType.GLOSSARY,
+                selector="article",
+                chapter_str="glossary",
+            )
+            self.processed_content["glossary"] = glossary_xhtml
 
-        # Process individual lessons
-        self._process_lessons(lesson_data)
+            # Process individual lessons
+            self._process_lessons(lesson_data)
+        finally:
+            self.progress.stop()
+            self.fetcher.close()
+            self.image_processor.close()
 
         # Save XHTML files to disk for debugging/backup
         self._save_xhtml_files()
@@ -73,15 +94,14 @@ class ImabiProcessor:
         typer.echo(f"🌐 Fetching: {url}")
 
         html_content, base_uri = self.fetcher.fetch_content(url)
-        soup = BeautifulSoup(html_content, "html.parser")
-        content_div = soup.select_one(selector)
+        content_el = self.cleaner.extract(html_content, selector)
 
-        if not content_div:
+        if content_el is None:
             msg = f"No content found with selector '{selector}' at {url}"
             raise ValueError(msg)
 
-        # Clean HTML structure
-        content_div = self.cleaner.clean_structure(content_div)
+        # Clean on the lxml tree, then hand the pruned subtree to BeautifulSoup
+        content_div = self.cleaner.to_soup(self.cleaner.clean_tree(content_el))
 
         # Process images and collect them
         processed_images = self.image_processor.process_images(
@@ -112,17 +132,22 @@ class ImabiProcessor:
 
     def _process_lessons(self, lesson_dict: dict[str, list[LessonData]]) -> None:
         """Process all individual lessons from the lesson dictionary."""
-        lessons_to_process = [lesson for lessons in lesson_dict.values() for lesson in lessons if lesson.has_link]
+        linked_lessons = (lesson for lessons in lesson_dict.values() for lesson in lessons if lesson.has_link)
 
         if self.config.test_mode:
-            lessons_to_process = lessons_to_process[: self.config.test_lessons]
+            lessons_to_process = list(islice(linked_lessons, self.config.test_lessons))
             typer.echo(f"🧪 Test mode: processing {len(lessons_to_process)} lessons")
+        else:
+            lessons_to_process = list(linked_lessons)
 
-        for lesson in lessons_to_process:
-            try:
-                self._process_single_lesson(lesson)
-            except Exception as e:
-                typer.echo(f"❌ Error processing lesson {lesson.number} ({lesson.title}): {e}")
+        with ThreadPoolExecutor(max_workers=self.MAX_FETCH_WORKERS) as executor:
+            futures = {executor.submit(self._process_single_lesson, lesson): lesson for lesson in lessons_to_process}
+            for future in as_completed(futures):
+                lesson = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    typer.echo(f"❌ Error processing lesson {lesson.number} ({lesson.title}): {e}")
 
     def _process_single_lesson(self, lesson: LessonData) -> None:
         """Process a single lesson and store the result."""
@@ -131,20 +156,19 @@ class ImabiProcessor:
             typer.echo(f"📖 Processing lesson: {lesson.original_number} - {lesson.title}")
 
             html_content, base_uri = self.fetcher.fetch_content(url)
-            soup = BeautifulSoup(html_content, "html.parser")
-            main_div = soup.select_one("article")
+            main_el = self.cleaner.extract(html_content, "article")
 
-        if not main_div:
+        if main_el is None:
             typer.echo(f"⚠️  No article content found for lesson {lesson.number}")
             return
 
         # Save raw HTML if requested
         if self.config.save_raw:
             raw_path = self.config.raw_dir / f"raw-{lesson.id}.html"
-            raw_path.write_text(str(main_div.prettify()), encoding="utf-8")
+            raw_path.write_bytes(lxml_html.tostring(main_el))
 
-        # Clean and process
-        main_div = self.cleaner.clean_structure(main_div)
+        # Clean on the lxml tree, then hand the pruned subtree to BeautifulSoup
+        main_div = self.cleaner.to_soup(self.cleaner.clean_tree(main_el))
 
         # Process images for this lesson
         processed_images = self.image_processor.process_images(
@@ -153,7 +177,6 @@ class ImabiProcessor:
             self.config.images_dir,
             lesson.id,
         )
-        self.all_processed_images.extend(processed_images)
 
         # Format lesson content
         path_part = main_div.get("id", f"lesson-{lesson.id}")
@@ -165,16 +188,23 @@ class ImabiProcessor:
         )
 
         # Store processed content
-        self.processed_content[lesson.id] = formatted_xhtml
+        with self._results_lock:
+            self.all_processed_images.extend(processed_images)
+            self.processed_content[lesson.id] = formatted_xhtml
 
     def _save_xhtml_files(self) -> None:
         """Save all processed XHTML files to disk for debugging/backup."""
         output_path = self.config.output_dir / "Text"
         output_path.mkdir(exist_ok=True)
 
-        for content_id, xhtml_content in self.processed_content.items():
-            filename = f"{content_id}.xhtml" if content_id in {"index", "glossary"} else f"{content_id}.xhtml"
-
-            file_path = output_path / filename
+        def write_one(item: tuple[str, str]) -> Path:
+            content_id, xhtml_content = item
+            file_path = output_path / f"{content_id}.xhtml"
             file_path.write_text(xhtml_content, encoding="utf-8")
-            typer.echo(f"💾 Saved: {file_path}")
+            return file_path
+
+        # write_text releases the GIL in the write syscall, so a small pool
+        # overlaps the disk I/O
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for file_path in executor.map(write_one, self.processed_content.items()):
+                typer.echo(f"💾 Saved: {file_path}")
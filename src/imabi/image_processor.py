@@ -1,23 +1,41 @@
 from __future__ import annotations
 
 from io import BytesIO
+import os
 from pathlib import Path
+from functools import lru_cache
+import threading
 from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from rich.progress import Progress
 
 from bs4 import Tag
 from PIL import Image
+import httpx
 import typer
-import requests
-from wand.image import Image as wandImage
-from wand.exceptions import WandException
+
+from .content_fetcher import USER_AGENT
 
 
 # Importaciones opcionales: el programa no se detendrá si no están instaladas
+try:
+    import resvg_py
+except ImportError:
+    resvg_py = None  # Rasterizador preferido; liviano y sin delegados externos
+
 try:
     import cairosvg
 except (ImportError, OSError):
     cairosvg = None  # Si no se puede importar o le falta una dependencia, lo marcamos como no disponible
 
+try:
+    from wand.image import Image as wandImage
+    from wand.exceptions import WandException
+except ImportError:
+    wandImage = None  # Wand requiere la librería ImageMagick del sistema
+    WandException = Exception
+
 try:
     from svglib.svglib import svg2rlg
     from reportlab.graphics import renderPM
@@ -25,12 +43,124 @@ except ImportError:
     svg2rlg = None  # Marcamos svglib como no disponible si no está instalada
 
 
+@lru_cache(maxsize=128)
+def _rasterize_svg(image_data: bytes) -> bytes:
+    """Rasterize SVG bytes to PNG, trying resvg, then cairosvg, then Wand.
+
+    Memoized so repeated identical icons (arrows, bullets) are rasterized
+    once per run.
+    """
+    if resvg_py is not None:
+        try:
+            return bytes(resvg_py.svg_to_bytes(svg_string=image_data.decode("utf-8")))
+        except Exception as e:
+            typer.echo(f"⚠️  resvg falló: {e}")
+    if cairosvg is not None:
+        try:
+            return cairosvg.svg2png(bytestring=image_data)
+        except Exception as e:
+            typer.echo(f"⚠️  cairosvg falló: {e}")
+    if wandImage is not None:
+        try:
+            typer.echo("⚙️  Intentando convertir SVG con ImageMagick (Wand)...")
+            # ImageMagick necesita saber que los datos de entrada son SVG
+            # Usamos un bloque 'with' para asegurar que los recursos se liberen
+            with wandImage(blob=image_data, format="svg") as img:
+                img.format = "png"
+                # Devuelve los datos de la imagen convertida en bytes
+                return img.make_blob()
+        except WandException as e:
+            # Capturamos excepciones específicas de Wand/ImageMagick
+            typer.echo(f"❌ ImageMagick falló: {e}. No se pudo convertir el SVG.")
+    return image_data
+
+
+def _convert_to_png_worker(image_data: bytes, original_format: str, max_dim: int) -> bytes:
+    """Convert SVG or WebP image data to PNG format.
+
+    Module-level (picklable) so it can run in worker processes: the PNG
+    encode in zlib and SVG rasterization are CPU-bound and hold the GIL,
+    so converting in-process would serialize the download threads.
+    """
+    if original_format == ".svg":
+        return _rasterize_svg(image_data)
+
+    # --- Bloque para otros formatos (WebP, etc.) usando Pillow ---
+    try:
+        with Image.open(BytesIO(image_data)) as img:
+            # Downscale oversized sources before the encode
+            if max(img.size) > max_dim:
+                img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+
+            # Convert to RGB if needed (for transparency support)
+            if img.mode in {"RGBA", "LA", "P"}:
+                # Create white background for transparent images
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                if img.mode == "P":
+                    img = img.convert("RGBA")
+
+                mask = img.split()[-1] if img.mode in {"RGBA", "LA"} else None
+                background.paste(img, mask=mask)
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            # Save as PNG; after the white-background composite the image
+            # is opaque RGB, so skip the max-effort optimize pass in favor
+            # of zlib's default level
+            png_buffer = BytesIO()
+            img.save(png_buffer, format="PNG", optimize=False, compress_level=6)
+            return png_buffer.getvalue()
+    except Exception as e:
+        typer.echo(f"⚠️  Failed to convert image: {e}")
+        return image_data  # Return original if conversion fails
+
+
 class ImageProcessor:
     """Handles image processing, downloading, and format conversion."""
 
-    def __init__(self, session: requests.Session | None = None) -> None:
-        """Initialize the processor with a requests session."""
-        self.session = session or requests.Session()
+    MAX_DOWNLOAD_WORKERS = 16
+
+    def __init__(
+        self,
+        session: httpx.Client | None = None,
+        convert_webp: bool = True,
+        image_max_dim: int = 1280,
+        progress: Progress | None = None,
+    ) -> None:
+        """Initialize the processor with an HTTP/2 client with keep-alive pooling."""
+        self.convert_webp = convert_webp
+        # Per-image typer.echo calls serialize the download workers on the
+        # stdout lock; with a Progress we advance one bar and log errors only
+        self.progress = progress
+        # EPUB viewports rarely need more; downscaling cuts encode time and
+        # output size roughly quadratically
+        self.image_max_dim = image_max_dim
+        # WebP passes through untouched when targeting EPUB 3.2+ readers
+        self._convert_exts = {".svg", ".webp"} if convert_webp else {".svg"}
+        # Shared icons (furigana helpers, kana charts) recur across lessons;
+        # cache results per resolved URL so each is downloaded/converted once
+        self._cache: dict[str, tuple[str, str, Path]] = {}
+        self._cache_lock = threading.Lock()
+        # CPU-bound conversions run in worker processes so the encode scales
+        # with cores instead of queueing behind the GIL. Worker processes are
+        # spawned lazily on first submit, and in-flight conversions (and thus
+        # buffered image bytes) are bounded by the download thread pool
+        self._cpu_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        # HTTP/2 multiplexes the worker pool's concurrent GETs over a handful
+        # of TLS connections instead of one handshake per pooled socket.
+        # Re-runs are deduplicated by the on-disk dest_file check rather than
+        # an HTTP cache, and the transport retries connection-level failures
+        self.session = session or httpx.Client(
+            timeout=httpx.Timeout(10.0),
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=4, max_connections=32),
+            ),
+        )
 
     def process_images(
         self,
@@ -38,17 +168,42 @@ class ImageProcessor:
         base_uri: str,
         output_dir: Path,
         chapter_str: str,
-    ) -> list[tuple[str, bytes]]:
-        """Process all images in content, returning list of (filename, data) tuples."""
+    ) -> list[tuple[str, str, Path]]:
+        """Process all images in content, returning list of (stem, suffix, path) tuples."""
         img_tags = content_div.find_all("img")
-        processed_images = []
+        if not img_tags:
+            return []
 
-        for i, img_tag in enumerate(img_tags, 1):
-            image_data = self._process_single_image(img_tag, base_uri, output_dir, chapter_str, i)
-            if image_data:
-                processed_images.append(image_data)
+        task_id = None
+        if self.progress is not None:
+            task_id = self.progress.add_task(f"🖼️  Images ({chapter_str})", total=len(img_tags))
 
-        return processed_images
+        # Download in parallel; each worker mutates only its own img tag.
+        # Counters are assigned before submission so names stay stable.
+        results: dict[int, tuple[str, str, Path]] = {}
+        with ThreadPoolExecutor(max_workers=self.MAX_DOWNLOAD_WORKERS) as executor:
+            futures = {
+                executor.submit(self._process_single_image, img_tag, base_uri, output_dir, chapter_str, i): i
+                for i, img_tag in enumerate(img_tags, 1)
+            }
+            for future in as_completed(futures):
+                image_data = future.result()
+                if image_data:
+                    results[futures[future]] = image_data
+                if task_id is not None:
+                    self.progress.advance(task_id)
+
+        if task_id is not None:
+            self.progress.remove_task(task_id)
+
+        return [results[i] for i in sorted(results)]
+
+    def _log(self, message: str) -> None:
+        """Log through the progress console when one is active, else stdout."""
+        if self.progress is not None:
+            self.progress.console.log(message)
+        else:
+            typer.echo(message)
 
     def _process_single_image(
         self,
@@ -57,83 +212,66 @@ class ImageProcessor:
         img_output_dir: Path,
         chapter_str: str,
         img_counter: int,
-    ) -> tuple[str, bytes] | None:
+    ) -> tuple[str, str, Path] | None:
         """Download and process a single image, converting to PNG if needed."""
         src = img_tag.get("src")
         if not src:
             return None
 
-        try:
-            full_src_url = urljoin(base_uri, src)
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
-            }
-            img_response = self.session.get(full_src_url, stream=True, headers=headers)
-            img_response.raise_for_status()
+        full_src_url = urljoin(base_uri, src)
+        with self._cache_lock:
+            hit = self._cache.get(full_src_url)
+        if hit is not None:
+            stem, ext, dest_file = hit
+            img_tag["src"] = f"../{dest_file.parent.name}/{stem}{ext}"
+            if img_tag.has_attr("srcset"):
+                del img_tag["srcset"]
+            return hit
 
+        try:
             original_ext = Path(urlparse(full_src_url).path).suffix.lower()
-
-            # Convert SVG and WebP to PNG
-            if original_ext in {".svg", ".webp"}:
-                new_name = f"chapter-{chapter_str}-img-{img_counter}.png"
-                image_data = self._convert_to_png(img_response.content, original_ext)
-            else:
-                ext = original_ext or ".jpg"
-                new_name = f"chapter-{chapter_str}-img-{img_counter}{ext}"
-                image_data = img_response.content
-
-            # Save to disk for debugging/backup
+            stem = f"chapter-{chapter_str}-img-{img_counter}"
+            needs_conversion = original_ext in self._convert_exts
+            ext = ".png" if needs_conversion else (original_ext or ".jpg")
+            new_name = f"{stem}{ext}"
             dest_file = img_output_dir / new_name
-            typer.echo(f"🖼️  Processing: {src[:30]}... -> {new_name}")
-            dest_file.write_bytes(image_data)
+
+            # Reuse output left on disk by a previous run
+            if not (dest_file.exists() and dest_file.stat().st_size > 0):
+                # Convert SVG (and, unless disabled, WebP) to PNG; anything
+                # else is piped from the socket straight to disk without
+                # buffering the whole body in memory. The EPUB step streams
+                # the file back later.
+                if needs_conversion:
+                    img_response = self.session.get(full_src_url)
+                    img_response.raise_for_status()
+                    dest_file.write_bytes(self._convert_to_png(img_response.content, original_ext))
+                else:
+                    with self.session.stream("GET", full_src_url) as img_response:
+                        img_response.raise_for_status()
+                        with dest_file.open("wb") as fh:
+                            for chunk in img_response.iter_bytes(65536):
+                                fh.write(chunk)
 
             # Update img tag src
             img_tag["src"] = f"../{img_output_dir.name}/{new_name}"
             if img_tag.has_attr("srcset"):
                 del img_tag["srcset"]
 
-            return new_name, image_data
+            result = (stem, ext, dest_file)
+            with self._cache_lock:
+                self._cache[full_src_url] = result
+            return result
 
         except Exception as e:
-            typer.echo(f"❌ Failed to process image {src}: {e}")
+            self._log(f"❌ Failed to process image {src}: {e}")
             return None
 
     def _convert_to_png(self, image_data: bytes, original_format: str) -> bytes:
-        """Convert SVG or WebP image data to PNG format."""
-        if original_format == ".svg":
-            try:
-                typer.echo("⚙️  Intentando convertir SVG con ImageMagick (Wand)...")
-                # ImageMagick necesita saber que los datos de entrada son SVG
-                # Usamos un bloque 'with' para asegurar que los recursos se liberen
-                with wandImage(blob=image_data, format="svg") as img:
-                    img.format = "png"
-                    # Devuelve los datos de la imagen convertida en bytes
-                    return img.make_blob()
-            except WandException as e:
-                # Capturamos excepciones específicas de Wand/ImageMagick
-                typer.echo(f"❌ ImageMagick falló: {e}. No se pudo convertir el SVG.")
-                return image_data
-
-        # --- Bloque para otros formatos (WebP, etc.) usando Pillow ---
-        try:
-            with Image.open(BytesIO(image_data)) as img:
-                # Convert to RGB if needed (for transparency support)
-                if img.mode in {"RGBA", "LA", "P"}:
-                    # Create white background for transparent images
-                    background = Image.new("RGB", img.size, (255, 255, 255))
-                    if img.mode == "P":
-                        img = img.convert("RGBA")
-
-                    mask = img.split()[-1] if img.mode in {"RGBA", "LA"} else None
-                    background.paste(img, mask=mask)
-                    img = background
-                elif img.mode != "RGB":
-                    img = img.convert("RGB")
-
-                # Save as PNG
-                png_buffer = BytesIO()
-                img.save(png_buffer, format="PNG", optimize=True)
-                return png_buffer.getvalue()
-        except Exception as e:
-            typer.echo(f"⚠️  Failed to convert image: {e}")
-            return image_data  # Return original if conversion fails
+        """Convert image data to PNG in the CPU worker pool."""
+        return self._cpu_pool.submit(_convert_to_png_worker, image_data, original_format, self.image_max_dim).result()
+
+    def close(self) -> None:
+        """Release the HTTP client and the conversion worker pool."""
+        self.session.close()
+        self._cpu_pool.shutdown()
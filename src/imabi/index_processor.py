@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from html import unescape
 
 from bs4 import Tag, BeautifulSoup
 
@@ -11,6 +12,11 @@ from .text_processor import ContentFormatter
 class IndexProcessor(ContentFormatter):
     """Processes index content and extracts lesson information."""
 
+    _BR_SPLIT = re.compile(r"<br\s*/?>", re.IGNORECASE)
+    # Matches "第5課: Title" and variants; some imabi entries use the
+    # full-width colon "：", which the old split on "課:" missed
+    _LESSON_RE = re.compile(r"^\s*(?P<orig>第?\s*(?P<num>[^課]+?))\s*課\s*[:：]\s*(?P<title>.*)$", re.DOTALL)
+
     def process_index(self, content_div: Tag) -> tuple[str, dict[str, list[LessonData]]]:
         """Process index content, returning XHTML and lesson data."""
         lesson_dict = self._extract_sectioned_index(content_div)
@@ -37,19 +43,30 @@ class IndexProcessor(ContentFormatter):
 
         return {k: v for k, v in sections.items() if v}
 
-    def _break_paragraph_by_br(self, paragraph: Tag) -> BeautifulSoup:
-        """Break paragraph content by <br> tags into new <p> tags."""
+    def _break_paragraph_by_br(self, paragraph: Tag) -> list[str]:
+        """Split paragraph inner HTML on <br> tags into stripped fragments."""
         content = paragraph.decode_contents()
-        children = re.split(r"<br\s*/?>", content)
-        new_content = "".join(f"<p>{child.strip()}</p>" for child in children if child.strip())
-        return BeautifulSoup(new_content, "html.parser")
+        return [child for child in map(str.strip, self._BR_SPLIT.split(content)) if child]
+
+    def _extract_links_from_paragraphs(self, fragments: list[str], start_number: int) -> list[LessonData]:
+        """Extract lesson data from a list of HTML fragments.
 
-    def _extract_links_from_paragraphs(self, paragraphs: BeautifulSoup, start_number: int) -> list[LessonData]:
-        """Extract lesson data from a collection of paragraph elements."""
+        A fragment is only fed back through BeautifulSoup when it actually
+        contains markup; the common plain-text entry skips the parse.
+        """
         lessons = []
-        for idx, element in enumerate(paragraphs.find_all("p"), start=start_number):
-            link_data = self._extract_link_data(element)
-            lesson_info = self._parse_lesson_text(element.get_text(strip=True))
+        for idx, fragment in enumerate(fragments, start=start_number):
+            if "<a " in fragment:
+                element = BeautifulSoup(fragment, "lxml")
+                link_data = self._extract_link_data(element)
+                text = element.get_text(strip=True)
+            elif "<" in fragment:
+                link_data = None
+                text = BeautifulSoup(fragment, "lxml").get_text(strip=True)
+            else:
+                link_data = None
+                text = unescape(fragment)
+            lesson_info = self._parse_lesson_text(text)
             lesson = LessonData(
                 number=idx,
                 lesson_number=lesson_info["number"],
@@ -74,14 +91,14 @@ class IndexProcessor(ContentFormatter):
 
     def _parse_lesson_text(self, text: str) -> dict[str, str]:
         """Parse lesson number and title from text."""
-        parts = text.split("課:", 1)
-        if len(parts) < 2:
+        match = self._LESSON_RE.match(text)
+        if not match:
             return {"number": "N/A", "original": text.strip(), "title": text.strip()}
-        original_number_part = parts[0].strip()
-        title = parts[1].strip()
-        number = original_number_part.replace("第", "")
-        original = f"{original_number_part}課"
-        return {"number": number, "original": original, "title": title}
+        return {
+            "number": match["num"],
+            "original": f"{match['orig']}課",
+            "title": match["title"].strip(),
+        }
 
     def _create_index_xhtml(self, lesson_dict: dict[str, list[LessonData]]) -> str:
         """Create a structured XHTML index from the lesson dictionary."""
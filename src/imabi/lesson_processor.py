@@ -1,16 +1,22 @@
 # ♥♥─── Imabi Content Processor ───────────────────────────
 from __future__ import annotations
 
-import re
-
 from bs4 import Tag, BeautifulSoup
 
 from .text_processor import ContentFormatter
 
 
+# Internal cross-references get rewritten to relative lesson paths
+_IMABI_PREFIX = "https://imabi.org/"
+_IMABI_PREFIX_LEN = len(_IMABI_PREFIX)
+
+
 class LessonFormatter(ContentFormatter):
     """Formats lesson content according to specific rules."""
 
+    # h1 is reserved for the page title; everything else moves down a level
+    _HEADING_BUMP = {"h2": "h3", "h3": "h4", "h4": "h5", "h5": "h6", "h6": "h6"}
+
     def format_lesson(
         self,
         content: Tag,
@@ -23,20 +29,52 @@ class LessonFormatter(ContentFormatter):
         if not is_glossary and content.header:
             content.header.extract()
 
-        self._adjust_heading_levels(content)
-        self._setup_headers(content, title, chapter, is_glossary)
-        self._process_common_formatting(content)
+        # Split paragraphs first so the single walk sees the final <p> set,
+        # then do heading bumps, classification, and link fixes in one pass
+        self._strip_paragraphs(content)
+        first_header = self._walk_once(content)
+        self._setup_headers(content, title, chapter, is_glossary, first_header)
 
         final_content = self._wrap_final_content(content, path_part)
         return self._wrap_xhtml(final_content, title)
 
-    def _setup_headers(self, content: Tag, title: str, chapter: str | int, is_glossary: bool) -> None:
+    def _walk_once(self, content: Tag) -> Tag | None:
+        """Apply heading bumps, paragraph classes, and link fixes in one traversal.
+
+        Replaces the separate find_all passes per heading level, paragraph,
+        and anchor; each costs a full tree walk on long lessons. Returns the
+        first element that was already a heading in the source, so the
+        ▼ paragraphs promoted to <h6> here never become the lesson header.
+        """
+        first_header = None
+        for tag in [d for d in content.descendants if isinstance(d, Tag)]:
+            name = tag.name
+            bumped = self._HEADING_BUMP.get(name)
+            if bumped is not None:
+                tag.name = bumped
+            elif name == "p":
+                self._classify_paragraph(tag)
+            elif name == "a":
+                href = tag.get("href")
+                if href and href.startswith(_IMABI_PREFIX):
+                    # Slice past the prefix instead of a full-string replace
+                    tag["href"] = "../" + href[_IMABI_PREFIX_LEN:]
+            if first_header is None and name[0] == "h" and name[1:].isdigit():
+                first_header = tag
+        return first_header
+
+    def _setup_headers(
+        self,
+        content: Tag,
+        title: str,
+        chapter: str | int,
+        is_glossary: bool,
+        first_header: Tag | None,
+    ) -> None:
         """Set up header structure based on content type."""
-        headers = content.find_all(re.compile(r"^h\d"))
-        if not headers:
+        if first_header is None:
             return
 
-        first_header = headers[0]
         if is_glossary:
             first_header.name = "h1"
             first_header["id"] = "glossary"
@@ -44,23 +82,15 @@ class LessonFormatter(ContentFormatter):
             first_header.name = "h2"
             first_header["id"] = f"chapter-{chapter[1:-1] if isinstance(chapter, str) else chapter}"
             header_content = f'<header><p class="chapter">{chapter}</p>{first_header}</header>'
-            content.insert(0, BeautifulSoup(header_content, "html.parser"))
+            # lxml wraps fragments in <html><body>, so pull the header back out
+            content.insert(0, BeautifulSoup(header_content, "lxml").header.extract())
             first_header.extract()
 
-    def _adjust_heading_levels(self, content: Tag) -> None:
-        """Adjust heading levels to maintain hierarchy."""
-        for i in range(6, 1, -1):
-            for tag in content.find_all(f"h{i}"):
-                new_level = min(i + 1, 6)
-                tag.name = f"h{new_level}"
-
-    def _wrap_final_content(self, content: Tag, path_part: str) -> BeautifulSoup:
+    def _wrap_final_content(self, content: Tag, path_part: str) -> Tag:
         """Wrap content in final <body> structure."""
         footer = content.find("footer")
         footnotes = content.find("ol", class_="wp-block-footnotes")
 
-        footer_content = f'<hr/><footer class="footnote">{footnotes}</footer>' if footnotes else "<footer></footer>"
-
         if footnotes:
             footnotes.extract()
         if footer:
@@ -75,5 +105,14 @@ class LessonFormatter(ContentFormatter):
         else:
             content.body["class"] = "justified"
 
-        final_html = f"{content}{footer_content}"
-        return BeautifulSoup(final_html, features="html.parser")
+        # Append the footer as tree nodes instead of serializing the whole
+        # body and reparsing it with the footer markup glued on
+        if footnotes:
+            content.append(content.new_tag("hr"))
+            new_footer = content.new_tag("footer", attrs={"class": "footnote"})
+            new_footer.append(footnotes)
+            content.append(new_footer)
+        else:
+            content.append(content.new_tag("footer"))
+
+        return content
@@ -24,6 +24,8 @@ def process(
     test_lessons: int = typer.Option(5, "--test-lessons", help="Number of lessons to process in test mode"),
     save_raw: bool = typer.Option(False, "--save-raw", "-r", help="Save raw, unprocessed HTML for debugging"),
     no_epub: bool = typer.Option(False, "--no-epub", help="Skip generating the final EPUB file"),
+    keep_webp: bool = typer.Option(False, "--keep-webp", help="Keep WebP images as-is (for EPUB 3.2+ readers)"),
+    image_max_dim: int = typer.Option(1280, "--image-max-dim", help="Downscale converted images to this max dimension"),
     cover_image: Path = typer.Option(None, "--cover-image", help="Path to a custom cover image"),
     fonts_dir: Path = typer.Option(None, "--fonts-dir", help="Directory with custom fonts to embed"),
 ) -> None:
@@ -34,6 +36,8 @@ def process(
         output_dir=output_dir,
         css_file=css_file,
         generate_epub=not no_epub,
+        convert_webp=not keep_webp,
+        image_max_dim=image_max_dim,
         save_raw=save_raw,
         test_mode=test_mode,
         test_lessons=test_lessons,
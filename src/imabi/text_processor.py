@@ -1,40 +1,36 @@
 from __future__ import annotations
 
 import re
+from html import escape
 
-from bs4 import Tag, BeautifulSoup
+from bs4 import Tag, NavigableString
 
 
-class ContentFormatter:
-    """Base class for content formatting."""
-
-    LIST_PATTERN = re.compile(r"^(\d+\.|[ivxlcdm]+\.|※|・)")
-    BR_REPLACEMENT_PATTERN = re.compile(r"(<br\s*/?>\s*){2,}")
-    URL_REPLACEMENTS = {}
-
-    def _wrap_xhtml(self, content: BeautifulSoup | str, title: str) -> str:
-        """Wrap content in a standard XHTML structure for EPUB."""
-        clean_title = title.replace(".xhtml", "").replace("-", " ").title()
-        css_path = "https://imabi.org/Styles/base_style.css"
-
-        body_content = str(content) if isinstance(content, BeautifulSoup) else content
-
-        return f"""<?xml version="1.0" encoding="utf-8"?>
+# The CSS path never varies, so it is baked into the template; only the title
+# and body are filled in per page.
+_XHTML_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
         <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN"
         "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">
         <html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
         <head>
-        <title>{clean_title}</title>
-        <link href="{css_path}" rel="stylesheet" type="text/css"/>
+        <title>{title}</title>
+        <link href="https://imabi.org/Styles/base_style.css" rel="stylesheet" type="text/css"/>
         </head>
-        {body_content}
+        {body}
         </html>"""
 
-    def _process_common_formatting(self, content: Tag) -> None:
-        """Apply common formatting rules to content."""
-        self._strip_paragraphs(content)
-        self._process_paragraphs(content)
-        self._fix_links(content)
+
+class ContentFormatter:
+    """Base class for content formatting."""
+
+    LIST_PATTERN = re.compile(r"^(\d+\.|[ivxlcdm]+\.|※|・)", re.IGNORECASE)
+    URL_REPLACEMENTS = {}
+
+    def _wrap_xhtml(self, content: Tag | str, title: str) -> str:
+        """Wrap content in a standard XHTML structure for EPUB."""
+        clean_title = escape(title.replace(".xhtml", "").replace("-", " ").title())
+        body_content = content if isinstance(content, str) else content.decode()
+        return _XHTML_TEMPLATE.format(title=clean_title, body=body_content)
 
     def _strip_paragraphs(self, content: Tag) -> None:
         """Replace multiple BR tags with proper paragraph breaks."""
@@ -42,30 +38,65 @@ class ContentFormatter:
             self._replace_multiple_br_tags(p)
 
     def _replace_multiple_br_tags(self, paragraph: Tag) -> None:
-        """Replace multiple <br> tags with paragraph breaks."""
-        html = "".join(str(c) for c in paragraph.contents)
-        html = self.BR_REPLACEMENT_PATTERN.sub("</p><p>", html)
-        new_soup = BeautifulSoup(f"<p>{html}</p>", "html.parser")
-        paragraph.replace_with(new_soup)
-
-    def _process_paragraphs(self, content: Tag) -> None:
-        """Process paragraphs for better formatting."""
-        for p in content.find_all("p"):
-            self._classify_paragraph(p)
+        """Split a paragraph on runs of two or more <br> tags.
+
+        Children are moved into the new paragraphs in place; nothing is
+        re-serialized or re-parsed.
+        """
+        segments: list[list] = [[]]
+        children = list(paragraph.contents)
+        i = 0
+        while i < len(children):
+            node = children[i]
+            if not (isinstance(node, Tag) and node.name == "br"):
+                segments[-1].append(node)
+                i += 1
+                continue
+
+            # Measure the run of <br> tags, whitespace-only strings included
+            run = []
+            br_count = 0
+            while i < len(children):
+                node = children[i]
+                if isinstance(node, Tag) and node.name == "br":
+                    br_count += 1
+                elif not (isinstance(node, NavigableString) and not node.strip()):
+                    break
+                run.append(node)
+                i += 1
+
+            if br_count >= 2:
+                # Two or more: this is a paragraph break
+                segments.append([])
+            else:
+                # A lone <br> stays where it was
+                segments[-1].extend(run)
+
+        if len(segments) == 1:
+            return
+
+        for segment in segments:
+            new_p = paragraph.new_tag("p")
+            for node in segment:
+                new_p.append(node.extract())
+            paragraph.insert_before(new_p)
+        paragraph.decompose()
 
     def _classify_paragraph(self, paragraph: Tag) -> None:
-        """Add appropriate classes to paragraphs based on content."""
-        text = paragraph.get_text(strip=True).lower()
+        """Add appropriate classes to paragraphs based on content.
+
+        Both markers sit at the start of the paragraph, so only the first
+        non-empty text run is inspected instead of joining the whole subtree
+        with get_text.
+        """
+        first = next(
+            (child for child in paragraph.descendants if isinstance(child, NavigableString) and child.strip()),
+            None,
+        )
+        if first is None:
+            return
+        text = first.strip()
         if self.LIST_PATTERN.match(text):
             paragraph["class"] = "numerada"
         if text.startswith("▼"):
             paragraph.name = "h6"
-
-    def _fix_links(self, content: Tag) -> None:
-        """Fix internal and external links."""
-        for a in content.find_all("a"):
-            href = a.get("href", "")
-            if not href:
-                continue
-            if href.startswith("https://imabi.org/"):
-                a["href"] = href.replace("https://imabi.org/", "../")